@@ -8,18 +8,22 @@ and uploads them to Weaviate for RAG-based querying.
 Requirements:
 - LM Studio running locally on port 1234 with an embedding model loaded
 - Weaviate running on localhost:8080 (via docker-compose)
-- Python packages: requests, weaviate-client, python-dotenv
+- Python packages: requests, weaviate-client, numpy, python-dotenv
 
 Usage:
     python create_weaviate_embeddings.py
 """
 
 import os
-import json
-import glob
+import functools
+import threading
 import requests
+import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from collections import deque
+from itertools import islice
 import weaviate
 from weaviate.util import generate_uuid5
 import time
@@ -30,6 +34,57 @@ WEAVIATE_URL = "http://localhost:8080"
 DEMO_SPECS_DIR = Path(__file__).parent.parent
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Concurrent embedding requests; keep low for local LM Studio, raise for hosted endpoints
+MAX_INFLIGHT_BATCHES = 4
+# Files read and chunked ahead of the embedding loop
+READ_AHEAD_FILES = 4
+
+class AdaptiveLimiter:
+    """Limits concurrent embedding requests by recent LM Studio latency
+
+    Above slow_threshold only one request runs at a time, each delayed by the p95;
+    below fast_threshold all max_concurrency requests may run again.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_INFLIGHT_BATCHES, window: int = 32,
+                 slow_threshold: float = 2.0, fast_threshold: float = 0.2, max_delay: float = 5.0):
+        self.latencies = deque(maxlen=window)
+        self.max_concurrency = max_concurrency
+        self.slow_threshold = slow_threshold
+        self.fast_threshold = fast_threshold
+        self.max_delay = max_delay
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def p95(self) -> float:
+        """95th percentile of the recent request times, in seconds"""
+        with self._cond:
+            samples = sorted(self.latencies)
+        if not samples:
+            return 0.0
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def acquire(self):
+        """Wait for a request slot, delaying first if recent requests have been slow"""
+        p95 = self.p95()
+        if p95 > self.slow_threshold:
+            time.sleep(min(p95, self.max_delay))
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    def release(self, seconds: float):
+        """Record the wall time of a finished request, failed or not, and adjust the limit"""
+        with self._cond:
+            self.in_flight -= 1
+            self.latencies.append(seconds)
+            p95 = self.p95()
+            if p95 > self.slow_threshold:
+                self.limit = 1
+            elif p95 < self.fast_threshold:
+                self.limit = self.max_concurrency
+            self._cond.notify_all()
 
 class LMStudioEmbedder:
     """Handles embedding generation via LM Studio"""
@@ -37,38 +92,75 @@ class LMStudioEmbedder:
     def __init__(self, model_name: str = "text-embedding-nomic-embed-text-v1.5"):
         self.model_name = model_name
         self.session = requests.Session()
+        # Embedding dimension, learned from the first response
+        self.dim = None
+        # Throttles requests when LM Studio slows down after many calls
+        self.limiter = AdaptiveLimiter()
 
-    def embed_text(self, text: str) -> List[float]:
-        """Generate embeddings for text using LM Studio"""
-        payload = {
-            "input": text,
-            "model": self.model_name,
-            "encoding_format": "float"
-        }
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST an embedding request, backing off while the server is slow"""
+        self.limiter.acquire()
+        start = time.monotonic()
 
         try:
             response = self.session.post(LM_STUDIO_URL, json=payload, timeout=30)
             response.raise_for_status()
-            data = response.json()
-
-            if "data" in data and len(data["data"]) > 0:
-                return data["data"][0]["embedding"]
-            else:
-                raise ValueError(f"No embedding data in response: {data}")
-
+            return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error calling LM Studio: {e}")
             raise
+        finally:
+            # Timeouts and errors count too; they are the slowdowns the limiter exists for
+            self.limiter.release(time.monotonic() - start)
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
-        return [self.embed_text(text) for text in texts]
+    def embed_text(self, text: str) -> np.ndarray:
+        """Generate embeddings for text using LM Studio"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate a (len(texts), dim) float32 matrix of embeddings in a single request"""
+        data = self._post({
+            "input": texts,
+            "model": self.model_name,
+            "encoding_format": "float"
+        })
+
+        embeddings = data.get("data", [])
+        if len(embeddings) == len(texts):
+            # Sort by index in case the server doesn't preserve input order
+            vectors = [d["embedding"] for d in sorted(embeddings, key=lambda d: d.get("index", 0))]
+        elif len(texts) > 1:
+            # Older LM Studio builds only embed the first input of an array
+            vectors = [self._embed_single(text) for text in texts]
+        else:
+            raise ValueError(f"No embedding data in response: {data}")
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        return matrix
+
+    def _embed_single(self, text: str) -> List[float]:
+        """Generate embeddings for one text with a dedicated request"""
+        data = self._post({
+            "input": text,
+            "model": self.model_name,
+            "encoding_format": "float"
+        })
+
+        if "data" in data and len(data["data"]) > 0:
+            return data["data"][0]["embedding"]
+        else:
+            raise ValueError(f"No embedding data in response: {data}")
 
 class WeaviateManager:
     """Manages Weaviate schema and data operations"""
 
     def __init__(self, url: str):
         self.client = weaviate.Client(url)
+        self.failed_uploads = 0
+        # The batch callback runs on the client's worker threads
+        self._failed_lock = threading.Lock()
 
     def create_schema(self):
         """Create the InfraSpec schema class"""
@@ -109,9 +201,30 @@ class WeaviateManager:
             else:
                 raise e
 
-    def upload_chunk(self, content: str, source_file: str, file_type: str,
-                    chunk_index: int, vector: List[float]):
-        """Upload a single chunk with its embedding"""
+    def configure_batch(self, batch_size: int = 100, num_workers: int = 4):
+        """Configure the client's batch importer for bulk uploads"""
+        self.failed_uploads = 0
+        self.client.batch.configure(
+            batch_size=batch_size,
+            dynamic=True,
+            num_workers=num_workers,
+            callback=self._check_batch_result
+        )
+
+    def _check_batch_result(self, results: List[Dict[str, Any]]):
+        """Report objects Weaviate rejected during a batch flush"""
+        for result in results or []:
+            errors = result.get("result", {}).get("errors")
+            if errors:
+                with self._failed_lock:
+                    self.failed_uploads += 1
+                properties = result.get("properties", {})
+                print(f"❌ Failed to upload chunk {properties.get('chunk_index')} "
+                      f"from {properties.get('source_file')}: {errors}")
+
+    def add_to_batch(self, batch, content: str, source_file: str, file_type: str,
+                     chunk_index: int, vector: np.ndarray):
+        """Queue a single chunk with its embedding on an open batch"""
         data_object = {
             "content": content,
             "source_file": source_file,
@@ -119,166 +232,188 @@ class WeaviateManager:
             "chunk_index": chunk_index
         }
 
-        # Generate deterministic UUID based on content
-        obj_uuid = generate_uuid5(data_object)
+        # Deterministic UUID from the chunk's position, so re-runs overwrite in place
+        obj_uuid = generate_uuid5(f"{source_file}:{chunk_index}")
 
         try:
-            self.client.data_object.create(
+            batch.add_data_object(
                 data_object=data_object,
                 class_name="InfraSpec",
                 uuid=obj_uuid,
-                vector=vector
+                vector=vector.tolist()
             )
             return True
         except Exception as e:
-            print(f"❌ Failed to upload chunk {chunk_index} from {source_file}: {e}")
+            print(f"❌ Failed to queue chunk {chunk_index} from {source_file}: {e}")
             return False
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Split text into overlapping chunks"""
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += chunk_size - overlap
-
-        # Break if we're at the end
-        if end >= len(text):
-            break
-
-    return chunks
-
-def load_file_content(file_path: Path) -> str:
-    """Load and extract content from various file types"""
+def chunk_stream(file_path: Path, chunk_size: int = CHUNK_SIZE,
+                 overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """Yield overlapping chunks while reading the file incrementally"""
     try:
-        if file_path.suffix.lower() in ['.json', '.yaml', '.yml']:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                if file_path.suffix.lower() == '.json':
-                    data = json.load(f)
-                    return json.dumps(data, indent=2)
-                else:
-                    return f.read()
-        elif file_path.suffix.lower() == '.log':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif file_path.suffix.lower() == '.md':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif file_path.suffix.lower() == '.py':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif file_path.suffix.lower() == '.tf':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            # Try to read as text
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+        # Read every format as raw text; the embedder doesn't need normalized JSON
+        with open(file_path, 'r', encoding='utf-8') as f:
+            chunk = f.read(chunk_size)
+            while chunk:
+                yield chunk
+
+                # Break if we're at the end
+                if len(chunk) < chunk_size:
+                    break
+
+                # Carry the overlap forward and read only the new stride
+                new_text = f.read(chunk_size - overlap)
+                if not new_text:
+                    break
+                chunk = chunk[chunk_size - overlap:] + new_text
     except Exception as e:
         print(f"⚠️  Failed to load {file_path}: {e}")
-        return ""
 
-def get_file_type(file_path: Path) -> str:
-    """Determine the type of spec file"""
-    parent_dir = file_path.parent.name
+def read_file_chunks(file_path: Path) -> List[Tuple[int, str]]:
+    """Read and chunk a file, dropping whitespace-only chunks"""
+    return [(i, chunk) for i, chunk in enumerate(chunk_stream(file_path)) if chunk.strip()]
+
+def read_ahead(files: List[Path], readers: ThreadPoolExecutor,
+               depth: int = READ_AHEAD_FILES) -> Iterator[Tuple[Path, List[Tuple[int, str]]]]:
+    """Yield (file, chunks) in order while up to `depth` files are read in the background"""
+    files_iter = iter(files)
+    pending = deque(
+        (file_path, readers.submit(read_file_chunks, file_path))
+        for file_path in islice(files_iter, depth)
+    )
+
+    while pending:
+        file_path, future = pending.popleft()
+        next_path = next(files_iter, None)
+        if next_path is not None:
+            pending.append((next_path, readers.submit(read_file_chunks, next_path)))
+        yield file_path, future.result()
+
+@functools.lru_cache(maxsize=256)
+def _classify_parent(parent_path: Path) -> str:
+    """Determine the spec type shared by all files in a directory"""
+    parent_dir = parent_path.name
     if parent_dir in ['openapi', 'kubernetes', 'policies', 'logs', 'scenarios', 'scripts', 'terraform', 'gitlab-ci', 'monitoring']:
         return parent_dir
-    elif 'openapi' in str(file_path):
+    return _classify_path(str(parent_path))
+
+def _classify_path(path_str: str) -> str:
+    """Determine the spec type from substrings of a path"""
+    path_lower = path_str.lower()
+    if 'openapi' in path_str:
         return 'openapi'
-    elif 'k8s' in str(file_path).lower() or 'kubernetes' in str(file_path).lower():
+    elif 'k8s' in path_lower or 'kubernetes' in path_lower:
         return 'kubernetes'
-    elif 'policy' in str(file_path).lower():
+    elif 'policy' in path_lower:
         return 'policies'
-    elif '.log' in str(file_path):
+    elif '.log' in path_str:
         return 'logs'
     else:
         return 'other'
 
+def get_file_type(file_path: Path) -> str:
+    """Determine the type of spec file"""
+    file_type = _classify_parent(file_path.parent)
+    if file_type == 'other':
+        # Fall back to the file name for files in unclassified directories
+        file_type = _classify_path(file_path.name)
+    return file_type
+
+def upload_batch(weaviate_mgr: WeaviateManager, batch, future, batch_items: List[Tuple[int, str]],
+                 source_file: str, file_type: str) -> Tuple[int, int]:
+    """Queue an embedded batch for upload and return (chunks embedded, chunks queued)"""
+    start = batch_items[0][0]
+
+    try:
+        vectors = future.result()
+    except Exception as e:
+        print(f"   ❌ Failed to process batch starting at chunk {start} of {source_file}: {e}")
+        return 0, 0
+
+    successful = 0
+    for (chunk_index, chunk), vector in zip(batch_items, vectors):
+        success = weaviate_mgr.add_to_batch(
+            batch,
+            content=chunk,
+            source_file=source_file,
+            file_type=file_type,
+            chunk_index=chunk_index,
+            vector=vector
+        )
+        if success:
+            successful += 1
+
+    print(f"   ✅ Queued batch starting at chunk {start} of {source_file}")
+    return len(batch_items), successful
+
 def process_demo_specs(embedder: LMStudioEmbedder, weaviate_mgr: WeaviateManager):
     """Process all demo specs and upload to Weaviate"""
     print("🔍 Discovering demo specification files...")
 
-    # Find all relevant files
-    patterns = [
-        "**/*.json",
-        "**/*.yaml",
-        "**/*.yml",
-        "**/*.md",
-        "**/*.log",
-        "**/*.py",
-        "**/*.tf"
-    ]
-
-    all_files = []
-    for pattern in patterns:
-        all_files.extend(DEMO_SPECS_DIR.glob(pattern))
-
-    # Filter out unwanted files
-    exclude_patterns = ['__pycache__', '.git', 'node_modules']
+    # Find all relevant files in a single traversal
+    wanted_suffixes = {'.json', '.yaml', '.yml', '.md', '.log', '.py', '.tf'}
+    exclude_dirs = {'__pycache__', '.git', 'node_modules'}
     files_to_process = []
 
-    for file_path in all_files:
-        if any(excl in str(file_path) for excl in exclude_patterns):
-            continue
-        if file_path.name.startswith('.'):
-            continue
-        files_to_process.append(file_path)
+    for root, dirs, files in os.walk(DEMO_SPECS_DIR):
+        # Prune excluded directories so their subtrees are never entered
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+
+        for name in files:
+            if name.startswith('.'):
+                continue
+            if os.path.splitext(name)[1].lower() in wanted_suffixes:
+                files_to_process.append(Path(root) / name)
+
+    files_to_process.sort()
 
     print(f"📁 Found {len(files_to_process)} files to process")
 
     total_chunks = 0
     successful_uploads = 0
 
-    for file_path in files_to_process:
-        print(f"📄 Processing: {file_path.relative_to(DEMO_SPECS_DIR)}")
-
-        content = load_file_content(file_path)
-        if not content.strip():
-            continue
-
-        # Chunk the content
-        chunks = chunk_text(content)
-        file_type = get_file_type(file_path)
-        relative_path = str(file_path.relative_to(DEMO_SPECS_DIR))
-
-        print(f"   📦 Created {len(chunks)} chunks")
-
-        # Process chunks in batches for efficiency
-        batch_size = 5
-        for i in range(0, len(chunks), batch_size):
-            batch_chunks = chunks[i:i+batch_size]
-
-            try:
-                # Generate embeddings for batch
-                vectors = embedder.embed_batch(batch_chunks)
-
-                # Upload each chunk
-                for j, (chunk, vector) in enumerate(zip(batch_chunks, vectors)):
-                    chunk_index = i + j
-                    success = weaviate_mgr.upload_chunk(
-                        content=chunk,
-                        source_file=relative_path,
-                        file_type=file_type,
-                        chunk_index=chunk_index,
-                        vector=vector
-                    )
-                    if success:
-                        successful_uploads += 1
-
-                total_chunks += len(batch_chunks)
-                print(f"   ✅ Uploaded batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1}")
-
-            except Exception as e:
-                print(f"   ❌ Failed to process batch starting at chunk {i}: {e}")
-                continue
+    # A single batch context spans all files so flushes are amortized across them
+    weaviate_mgr.configure_batch()
+
+    # One embedding request per batch, so keep batches large
+    batch_size = 32
+
+    with weaviate_mgr.client.batch as batch, \
+            ThreadPoolExecutor(max_workers=MAX_INFLIGHT_BATCHES) as executor, \
+            ThreadPoolExecutor(max_workers=2) as readers:
+        # Batches in flight across all files, so small files overlap one another
+        pending = {}
+
+        # Files are read and chunked ahead while earlier files are being embedded
+        for file_path, chunks in read_ahead(files_to_process, readers):
+            print(f"📄 Processing: {file_path.relative_to(DEMO_SPECS_DIR)}")
+            print(f"   📦 Created {len(chunks)} chunks")
+
+            file_type = get_file_type(file_path)
+            relative_path = str(file_path.relative_to(DEMO_SPECS_DIR))
+
+            # Submit batches while keeping a bounded number in flight
+            for i in range(0, len(chunks), batch_size):
+                batch_items = chunks[i:i+batch_size]
+                future = executor.submit(embedder.embed_batch, [c for _, c in batch_items])
+                pending[future] = (batch_items, relative_path, file_type)
+
+                if len(pending) >= MAX_INFLIGHT_BATCHES:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        embedded, queued = upload_batch(weaviate_mgr, batch, future, *pending.pop(future))
+                        total_chunks += embedded
+                        successful_uploads += queued
+
+        for future in as_completed(pending):
+            embedded, queued = upload_batch(weaviate_mgr, batch, future, *pending[future])
+            total_chunks += embedded
+            successful_uploads += queued
 
     print("\n📊 Processing Summary:")
     print(f"   Files processed: {len(files_to_process)}")
     print(f"   Total chunks: {total_chunks}")
-    print(f"   Successful uploads: {successful_uploads}")
+    print(f"   Successful uploads: {successful_uploads - weaviate_mgr.failed_uploads}")
 
 def main():
     """Main execution function"""
@@ -19,10 +19,13 @@ Usage:
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 
 # Configuration
@@ -31,6 +34,19 @@ WEAVIATE_URL = "http://localhost:8080"
 OPEN_WEBUI_URL = "http://localhost:3000"
 MCP_CONFIG_PATH = Path(__file__).parent.parent.parent / "mcp-config" / "mcp.json"
 
+# Static report fragments; only the placeholders are filled in per report
+REPORT_HEADER_TEMPLATE = """# Infrastructure as Spec - Daily Report
+
+**Generated:** {timestamp}
+**Date:** {date}
+
+## 🚨 Critical Alerts
+
+"""
+HEALTH_SECTION_TEMPLATE = "### {name}\n- **Status:** {icon} {status}\n"
+MCP_SERVER_TEMPLATE = "### {name}\n- **Configured:** ✅ Yes\n- **Command:** {command}\n- **Args:** {args}\n\n"
+REPORT_FOOTER = "\n---\n\n*This report is generated daily to monitor the Infrastructure as Spec platform health and performance.*"
+
 class ReportGenerator:
     """Generates comprehensive daily reports for the Infrastructure as Spec platform"""
 
@@ -46,64 +62,93 @@ class ReportGenerator:
             "recommendations": []
         }
 
+        # Pooled keep-alive connections shared by all probes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     def check_system_health(self) -> Dict[str, Any]:
         """Check health of all system components"""
-        health = {}
+        probes = {
+            "lm_studio": self._check_lm_studio,
+            "weaviate": self._check_weaviate,
+            "open_webui": self._check_open_webui
+        }
 
-        # Check LM Studio
+        # Probes are independent, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            futures = {name: executor.submit(probe) for name, probe in probes.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def _check_lm_studio(self) -> Dict[str, Any]:
+        """Check LM Studio"""
         try:
-            response = requests.get("http://localhost:1234/v1/models", timeout=5)
-            health["lm_studio"] = {
+            response = self.session.get("http://localhost:1234/v1/models", timeout=5)
+            return {
                 "status": "healthy" if response.status_code == 200 else "unhealthy",
                 "models_loaded": len(response.json().get("data", [])) if response.status_code == 200 else 0,
                 "response_time": response.elapsed.total_seconds()
             }
         except Exception as e:
-            health["lm_studio"] = {"status": "unhealthy", "error": str(e)}
+            return {"status": "unhealthy", "error": str(e)}
 
-        # Check Weaviate
+    def _check_weaviate(self) -> Dict[str, Any]:
+        """Check Weaviate"""
         try:
-            response = requests.get(f"{WEAVIATE_URL}/v1/meta", timeout=5)
-            health["weaviate"] = {
+            response = self.session.get(f"{WEAVIATE_URL}/v1/meta", timeout=5)
+            return {
                 "status": "healthy" if response.status_code == 200 else "unhealthy",
                 "version": response.json().get("version", "unknown") if response.status_code == 200 else "unknown",
                 "response_time": response.elapsed.total_seconds()
             }
         except Exception as e:
-            health["weaviate"] = {"status": "unhealthy", "error": str(e)}
+            return {"status": "unhealthy", "error": str(e)}
 
-        # Check Open WebUI
+    def _check_open_webui(self) -> Dict[str, Any]:
+        """Check Open WebUI"""
         try:
-            response = requests.get(f"{OPEN_WEBUI_URL}/health", timeout=5)
-            health["open_webui"] = {
+            response = self.session.get(f"{OPEN_WEBUI_URL}/health", timeout=5)
+            return {
                 "status": "healthy" if response.status_code == 200 else "unhealthy",
                 "response_time": response.elapsed.total_seconds()
             }
         except Exception as e:
-            health["open_webui"] = {"status": "unhealthy", "error": str(e)}
-
-        return health
+            return {"status": "unhealthy", "error": str(e)}
 
     def get_rag_metrics(self) -> Dict[str, Any]:
         """Get RAG knowledge base metrics"""
         metrics = {}
 
         try:
-            # Get InfraSpec class statistics
-            response = requests.get(f"{WEAVIATE_URL}/v1/schema/InfraSpec", timeout=5)
-            if response.status_code == 200:
-                schema_info = response.json()
-                metrics["schema_status"] = "exists"
-                metrics["properties"] = len(schema_info.get("properties", []))
-            else:
-                metrics["schema_status"] = "not_found"
-
-            # Get object count (approximate)
-            response = requests.get(f"{WEAVIATE_URL}/v1/objects", timeout=5, params={"class": "InfraSpec", "limit": 1})
-            if response.status_code == 200:
-                metrics["total_objects"] = len(response.json().get("objects", []))
-            else:
-                metrics["total_objects"] = "unknown"
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # Get InfraSpec class statistics
+                schema_future = executor.submit(
+                    self.session.get, f"{WEAVIATE_URL}/v1/schema/InfraSpec", timeout=5
+                )
+                # Get object count (approximate)
+                objects_future = executor.submit(
+                    self.session.get, f"{WEAVIATE_URL}/v1/objects", timeout=5,
+                    params={"class": "InfraSpec", "limit": 1}
+                )
+
+                response = schema_future.result()
+                if response.status_code == 200:
+                    schema_info = response.json()
+                    metrics["schema_status"] = "exists"
+                    metrics["properties"] = len(schema_info.get("properties", []))
+                else:
+                    metrics["schema_status"] = "not_found"
+
+                response = objects_future.result()
+                if response.status_code == 200:
+                    metrics["total_objects"] = len(response.json().get("objects", []))
+                else:
+                    metrics["total_objects"] = "unknown"
 
         except Exception as e:
             metrics["error"] = str(e)
@@ -163,7 +208,7 @@ class ReportGenerator:
                 "temperature": 0.3
             }
 
-            response = requests.post(LM_STUDIO_URL, json=payload, timeout=30)
+            response = self.session.post(LM_STUDIO_URL, json=payload, timeout=30)
             if response.status_code == 200:
                 result = response.json()
                 insights["system_analysis"] = result["choices"][0]["message"]["content"]
@@ -245,91 +290,96 @@ class ReportGenerator:
 
     def generate_report(self) -> str:
         """Generate the complete markdown report"""
-        self.report_data["system_health"] = self.check_system_health()
-        self.report_data["rag_metrics"] = self.get_rag_metrics()
-        self.report_data["mcp_status"] = self.check_mcp_servers()
-        self.report_data["ai_insights"] = self.generate_ai_insights()
+        # Data collection steps don't depend on each other, so run them concurrently
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            health_future = executor.submit(self.check_system_health)
+            rag_future = executor.submit(self.get_rag_metrics)
+            mcp_future = executor.submit(self.check_mcp_servers)
+            insights_future = executor.submit(self.generate_ai_insights)
+
+            self.report_data["system_health"] = health_future.result()
+            self.report_data["rag_metrics"] = rag_future.result()
+            self.report_data["mcp_status"] = mcp_future.result()
+            self.report_data["ai_insights"] = insights_future.result()
         self.report_data["critical_alerts"] = self.analyze_critical_alerts()
         self.report_data["recommendations"] = self.generate_recommendations()
 
-        # Generate markdown report
-        report = f"""# Infrastructure as Spec - Daily Report
-
-**Generated:** {self.report_data['timestamp']}
-**Date:** {self.report_data['date']}
+        # Generate markdown report; parts are joined once to keep building linear
+        parts = []
+        w = parts.append
 
-## 🚨 Critical Alerts
-
-"""
+        w(REPORT_HEADER_TEMPLATE.format_map(self.report_data))
 
         if self.report_data["critical_alerts"]:
             for alert in self.report_data["critical_alerts"]:
-                report += f"- {alert}\n"
+                w(f"- {alert}\n")
         else:
-            report += "✅ No critical alerts detected\n"
+            w("✅ No critical alerts detected\n")
 
-        report += "\n## 📊 System Health Status\n\n"
+        w("\n## 📊 System Health Status\n\n")
 
         health = self.report_data["system_health"]
         for component, status in health.items():
-            status_icon = "✅" if status.get("status") == "healthy" else "❌"
-            report += f"### {component.replace('_', ' ').title()}\n"
-            report += f"- **Status:** {status_icon} {status.get('status', 'unknown')}\n"
+            w(HEALTH_SECTION_TEMPLATE.format(
+                name=component.replace('_', ' ').title(),
+                icon="✅" if status.get("status") == "healthy" else "❌",
+                status=status.get('status', 'unknown')
+            ))
 
             if "models_loaded" in status:
-                report += f"- **Models Loaded:** {status['models_loaded']}\n"
+                w(f"- **Models Loaded:** {status['models_loaded']}\n")
             if "version" in status:
-                report += f"- **Version:** {status['version']}\n"
+                w(f"- **Version:** {status['version']}\n")
             if "response_time" in status:
-                report += f"- **Response Time:** {status['response_time']:.2f}s\n"
+                w(f"- **Response Time:** {status['response_time']:.2f}s\n")
             if "error" in status:
-                report += f"- **Error:** {status['error']}\n"
+                w(f"- **Error:** {status['error']}\n")
 
-            report += "\n"
+            w("\n")
 
-        report += "## 🧠 RAG Knowledge Base Metrics\n\n"
+        w("## 🧠 RAG Knowledge Base Metrics\n\n")
 
         rag = self.report_data["rag_metrics"]
-        report += f"- **Schema Status:** {'✅ Exists' if rag.get('schema_status') == 'exists' else '❌ Not Found'}\n"
-        report += f"- **Total Objects:** {rag.get('total_objects', 'Unknown')}\n"
-        report += f"- **Properties:** {rag.get('properties', 'Unknown')}\n"
+        w(f"- **Schema Status:** {'✅ Exists' if rag.get('schema_status') == 'exists' else '❌ Not Found'}\n")
+        w(f"- **Total Objects:** {rag.get('total_objects', 'Unknown')}\n")
+        w(f"- **Properties:** {rag.get('properties', 'Unknown')}\n")
 
         if "error" in rag:
-            report += f"- **Error:** {rag['error']}\n"
+            w(f"- **Error:** {rag['error']}\n")
 
-        report += "\n## 🔗 MCP Server Status\n\n"
+        w("\n## 🔗 MCP Server Status\n\n")
 
         mcp = self.report_data["mcp_status"]
-        report += f"- **Config Loaded:** {'✅ Yes' if mcp.get('config_loaded') else '❌ No'}\n"
-        report += f"- **Total Servers:** {mcp.get('total_servers', 0)}\n\n"
+        w(f"- **Config Loaded:** {'✅ Yes' if mcp.get('config_loaded') else '❌ No'}\n")
+        w(f"- **Total Servers:** {mcp.get('total_servers', 0)}\n\n")
 
         if mcp.get("servers"):
             for server_name, server_info in mcp["servers"].items():
-                report += f"### {server_name}\n"
-                report += f"- **Configured:** ✅ Yes\n"
-                report += f"- **Command:** {server_info.get('command')}\n"
-                report += f"- **Args:** {' '.join(server_info.get('args', []))}\n\n"
+                w(MCP_SERVER_TEMPLATE.format(
+                    name=server_name,
+                    command=server_info.get('command'),
+                    args=' '.join(server_info.get('args', []))
+                ))
 
         if "error" in mcp:
-            report += f"- **Error:** {mcp['error']}\n"
+            w(f"- **Error:** {mcp['error']}\n")
 
-        report += "## 🤖 AI-Generated Insights\n\n"
+        w("## 🤖 AI-Generated Insights\n\n")
 
         insights = self.report_data["ai_insights"]
         if "system_analysis" in insights:
-            report += insights["system_analysis"] + "\n\n"
+            w(insights["system_analysis"] + "\n\n")
         else:
-            report += "AI insights not available\n\n"
+            w("AI insights not available\n\n")
 
-        report += "## 💡 Recommendations\n\n"
+        w("## 💡 Recommendations\n\n")
 
         for rec in self.report_data["recommendations"]:
-            report += f"- {rec}\n"
+            w(f"- {rec}\n")
 
-        report += "\n---\n\n"
-        report += "*This report is generated daily to monitor the Infrastructure as Spec platform health and performance.*"
+        w(REPORT_FOOTER)
 
-        return report
+        return "".join(parts)
 
     def save_report(self, output_path: Optional[Path] = None) -> Path:
         """Save the report to a markdown file"""
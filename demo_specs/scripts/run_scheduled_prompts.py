@@ -1,10 +1,29 @@
 #!/usr/bin/env python3
 
+import os
+import re
+import json
 import schedule
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import yaml
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # APScheduler fires each cron expression on time instead of polling for due jobs
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.triggers.cron import CronTrigger
+except ImportError:
+    BlockingScheduler = None
+
+try:
+    # Aho-Corasick finds every alert keyword in a single pass over the answer
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Load config
 with open('scheduled_prompts.yaml') as f:
@@ -12,58 +31,193 @@ with open('scheduled_prompts.yaml') as f:
 
 OPEN_WEBUI_URL = "http://localhost:3000"
 GITLAB_API_URL = "https://gitlab.com/api/v4"
+OPEN_WEBUI_TOKEN = os.environ.get("OPEN_WEBUI_TOKEN", "")
+GITLAB_TOKEN = os.environ.get("GITLAB_TOKEN", "")
+PROJECT_ID = os.environ.get("GITLAB_PROJECT_ID", "")
+SLACK_WEBHOOK_URL = os.environ.get("SLACK_WEBHOOK_URL", "")
+NOTIFY_TIMEOUT = 5.0
+NOTIFY_ATTEMPTS = 3
+# Responses worth retrying: rate limiting and server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Keep-alive connections shared by every prompt and notification
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5)
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Notifications retry in post_with_retry, so their session has no adapter-level retries
+NOTIFY_SESSION = requests.Session()
+
+# Phrases that make a response worth alerting on, per alert threshold
+ALERT_KEYWORDS = {
+    'critical_cve': ['CRITICAL', 'HIGH severity', 'exploit available'],
+    'high_drop_rate': ['high rate', 'unexpected DROP', 'misconfiguration'],
+    'security_risk': ['overly permissive', 'security risk', 'should be restricted']
+}
+
+# Longest keyword minus one: how much earlier text a streamed delta must be scanned with
+ALERT_KEYWORD_OVERLAP = max(len(keyword) for keywords in ALERT_KEYWORDS.values() for keyword in keywords) - 1
+
+if ahocorasick is not None:
+    ALERT_AUTOMATON = ahocorasick.Automaton()
+    for _threshold, _keywords in ALERT_KEYWORDS.items():
+        for _keyword in _keywords:
+            _key = _keyword.lower()
+            ALERT_AUTOMATON.add_word(_key, ALERT_AUTOMATON.get(_key, frozenset()) | {_threshold})
+    ALERT_AUTOMATON.make_automaton()
+else:
+    ALERT_AUTOMATON = None
+    ALERT_PATTERNS = {
+        threshold: re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+        for threshold, keywords in ALERT_KEYWORDS.items()
+    }
+
+def complete_prompt(prompt, max_tokens=None, alert_threshold=None, on_alert=None):
+    """Send a single prompt to Open WebUI and return the answer
+
+    With an alert threshold the answer is streamed, and on_alert is called with the text so far
+    as soon as an alert keyword appears.
+    """
+    payload = {
+        "model": "llama3.1:8b",
+        "messages": [
+            {"role": "system", "content": "You are an MLSecOps assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        "rag_enabled": True,
+        "collection": "mlsecops-specs"
+    }
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
+
+    if alert_threshold in ALERT_KEYWORDS:
+        return stream_with_early_alert(payload, alert_threshold, on_alert)
 
-def run_prompt(schedule_config):
-    """Execute a scheduled prompt in Open WebUI"""
-    prompt = schedule_config['prompt']
-    
     # Call Open WebUI API
-    response = requests.post(
+    response = SESSION.post(
         f"{OPEN_WEBUI_URL}/api/chat/completions",
-        json={
-            "model": "llama3.1:8b",
-            "messages": [
-                {"role": "system", "content": "You are an MLSecOps assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            "rag_enabled": True,
-            "collection": "mlsecops-specs"
-        },
+        json=payload,
         headers={"Authorization": f"Bearer {OPEN_WEBUI_TOKEN}"}
     )
     
     result = response.json()
-    answer = result['choices'][^3_0]['message']['content']
-    
-    # Check if alert threshold met
-    if schedule_config.get('alert_threshold'):
-        if should_alert(answer, schedule_config['alert_threshold']):
-            send_notification(schedule_config, answer)
-    
+    return result['choices'][0]['message']['content']
+
+def stream_with_early_alert(payload, threshold, on_alert):
+    """Stream a completion, calling on_alert once at the first alert keyword, and return the full answer"""
+    parts = []
+    scanned = ""
+    alerted = False
+    with SESSION.post(
+        f"{OPEN_WEBUI_URL}/api/chat/completions",
+        json={**payload, "stream": True},
+        headers={"Authorization": f"Bearer {OPEN_WEBUI_TOKEN}"},
+        stream=True
+    ) as response:
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            data = line[len(b"data: "):]
+            if data == b"[DONE]":
+                break
+            delta = json.loads(data)['choices'][0].get('delta', {}).get('content') or ""
+            parts.append(delta)
+            if alerted:
+                continue
+
+            # Only rescan the new text plus enough overlap to catch a keyword split across deltas
+            scanned = scanned[-ALERT_KEYWORD_OVERLAP:] + delta
+            if should_alert(scanned, threshold):
+                # Alert now and keep reading; the complete answer follows the alert
+                alerted = True
+                if on_alert is not None:
+                    on_alert("".join(parts))
+    return "".join(parts)
+
+def run_prompt(schedule_config):
+    """Execute a scheduled prompt in Open WebUI"""
+    # Alert as soon as the threshold is met, while the rest of the answer is still generating
+    alerts = {}
+    answer = complete_prompt(
+        schedule_config['prompt'],
+        schedule_config.get('max_tokens'),
+        schedule_config.get('alert_threshold'),
+        on_alert=lambda partial: alerts.update(send_notification(schedule_config, partial))
+    )
+
+    if alerts:
+        send_full_answer(schedule_config, alerts, answer)
+
     return answer
 
 def should_alert(answer, threshold):
     """Determine if response warrants an alert"""
-    keywords = {
-        'critical_cve': ['CRITICAL', 'HIGH severity', 'exploit available'],
-        'high_drop_rate': ['high rate', 'unexpected DROP', 'misconfiguration'],
-        'security_risk': ['overly permissive', 'security risk', 'should be restricted']
-    }
-    
-    return any(keyword.lower() in answer.lower() for keyword in keywords.get(threshold, []))
+    if threshold not in ALERT_KEYWORDS:
+        return False
+
+    if ALERT_AUTOMATON is not None:
+        return any(threshold in thresholds for _, thresholds in ALERT_AUTOMATON.iter(answer.lower()))
+    return ALERT_PATTERNS[threshold].search(answer) is not None
+
+# Notifications go out in the background so a slow channel never holds up the scheduler
+NOTIFY_POOL = ThreadPoolExecutor(max_workers=4)
 
 def send_notification(schedule_config, answer):
-    """Send alert via configured channels"""
+    """Send alert via configured channels, returning each channel's pending notification"""
+    senders = {
+        'gitlab_issue': create_gitlab_issue,
+        'slack_webhook': send_slack_alert
+    }
+    alerts = {}
     for channel in schedule_config.get('notification', []):
-        if channel == 'gitlab_issue':
-            create_gitlab_issue(schedule_config['name'], answer)
-        elif channel == 'slack_webhook':
-            send_slack_alert(schedule_config['name'], answer)
+        if channel in senders:
+            future = NOTIFY_POOL.submit(senders[channel], schedule_config['name'], answer)
+            future.add_done_callback(lambda f, channel=channel: report_notification_failure(channel, f))
+            alerts[channel] = future
+    return alerts
+
+def send_full_answer(schedule_config, alerts, answer):
+    """Follow each sent alert with the complete answer"""
+    followers = {
+        'gitlab_issue': add_gitlab_note,
+        'slack_webhook': send_slack_followup
+    }
+    for channel, alert in alerts.items():
+        future = NOTIFY_POOL.submit(followers[channel], alert, schedule_config['name'], answer)
+        future.add_done_callback(lambda f, channel=channel: report_notification_failure(channel, f))
+
+def report_notification_failure(channel, future):
+    """Log a notification that failed after all retries"""
+    error = future.exception()
+    if error is not None:
+        print(f"⚠️  {channel} notification failed: {error}")
+
+def post_with_retry(url, retry_statuses=RETRYABLE_STATUSES, **kwargs):
+    """POST with a short timeout, retrying connection failures and retry_statuses with exponential backoff"""
+    for attempt in range(NOTIFY_ATTEMPTS):
+        last_attempt = attempt == NOTIFY_ATTEMPTS - 1
+        try:
+            response = NOTIFY_SESSION.post(url, timeout=NOTIFY_TIMEOUT, **kwargs)
+        except requests.ConnectionError:
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in retry_statuses or last_attempt:
+                response.raise_for_status()
+                return response
+        time.sleep(0.5 * 2 ** attempt)
 
 def create_gitlab_issue(title, description):
     """Create GitLab issue for alert"""
-    requests.post(
+    # A 5xx may come back after the issue was created, so only retry when it surely was not
+    response = post_with_retry(
         f"{GITLAB_API_URL}/projects/{PROJECT_ID}/issues",
+        retry_statuses={429},
         headers={"PRIVATE-TOKEN": GITLAB_TOKEN},
         json={
             "title": f"[MLSecOps Alert] {title}",
@@ -71,15 +225,87 @@ def create_gitlab_issue(title, description):
             "labels": ["mlsecops", "auto-generated", "security"]
         }
     )
+    return response.json()
+
+def add_gitlab_note(issue_future, title, answer):
+    """Attach the complete analysis to the alert's GitLab issue"""
+    # A failed issue was already reported; there is nothing to attach the note to
+    if issue_future.exception() is not None:
+        return
+    issue = issue_future.result()
+    post_with_retry(
+        f"{GITLAB_API_URL}/projects/{PROJECT_ID}/issues/{issue['iid']}/notes",
+        retry_statuses={429},
+        headers={"PRIVATE-TOKEN": GITLAB_TOKEN},
+        json={"body": f"## Full Analysis\n\n{answer}"}
+    )
+
+def send_slack_alert(title, message):
+    """Post alert to the configured Slack webhook"""
+    post_with_retry(
+        SLACK_WEBHOOK_URL,
+        json={"text": f"*[MLSecOps Alert] {title}*\n{message}"}
+    )
+
+def send_slack_followup(alert_future, title, answer):
+    """Post the complete analysis after the alert's Slack message"""
+    if alert_future.exception() is not None:
+        return
+    post_with_retry(
+        SLACK_WEBHOOK_URL,
+        json={"text": f"*[MLSecOps Alert] {title} - full analysis*\n{answer}"}
+    )
+
+def cron_fallback_jobs(cron):
+    """Translate a cron expression into unregistered `schedule` jobs, or None if it can't be run exactly
+
+    Only a fixed minute with an hour of "*", "*/N" or a list of hours, on every day, is supported.
+    """
+    fields = cron.split()
+    if len(fields) != 5 or fields[2:] != ['*', '*', '*'] or not fields[0].isdigit():
+        return None
+    minute, hour = int(fields[0]), fields[1]
+    if minute > 59:
+        return None
+
+    if hour == '*':
+        return [schedule.every().hour.at(f":{minute:02d}")]
+    if hour.startswith('*/') and hour[2:].isdigit() and int(hour[2:]) > 0:
+        hours = range(0, 24, int(hour[2:]))
+    elif all(h.isdigit() and int(h) < 24 for h in hour.split(',')):
+        hours = [int(h) for h in hour.split(',')]
+    else:
+        return None
+    return [schedule.every().day.at(f"{h:02d}:{minute:02d}") for h in hours]
 
 # Schedule all prompts
-for sched in config['schedules']:
-    if 'cron' in sched:
-        schedule.every().hour.at(sched['cron'].split()[^3_1]).do(
-            run_prompt, sched
-        )
-
-print("Scheduled prompt runner started")
-while True:
-    schedule.run_pending()
-    time.sleep(60)
\ No newline at end of file
+cron_schedules = [sched for sched in config['schedules'] if 'cron' in sched]
+
+if BlockingScheduler is not None:
+    # Jobs run on the scheduler's thread pool, so prompts due at the same time overlap
+    scheduler = BlockingScheduler()
+    for sched in cron_schedules:
+        scheduler.add_job(run_prompt, CronTrigger.from_crontab(sched['cron']), args=[sched], name=sched['name'])
+
+    print("Scheduled prompt runner started")
+    scheduler.start()
+else:
+    # `schedule` runs due jobs one after another, so hand them to a pool instead
+    executor = ThreadPoolExecutor(max_workers=8)
+    for sched in cron_schedules:
+        jobs = cron_fallback_jobs(sched['cron'])
+        if jobs is None:
+            print(f"⚠️  Skipping {sched['name']}: cron '{sched['cron']}' needs APScheduler")
+            continue
+        for job in jobs:
+            job.do(executor.submit, run_prompt, sched)
+
+    if not schedule.get_jobs():
+        raise SystemExit("No schedule can run without APScheduler; install apscheduler")
+
+    print("Scheduled prompt runner started")
+    while True:
+        schedule.run_pending()
+        # Sleep until the next job is due rather than waking up every minute
+        idle = schedule.idle_seconds()
+        time.sleep(max(idle, 0) if idle is not None else 60)
@@ -1,18 +1,42 @@
 from typing import Optional
 import re
 
+try:
+    # RE2 matches in linear time, so long replies can't trigger backtracking blowups
+    import re2
+except ImportError:
+    re2 = None
+
 class Filter:
     def __init__(self):
         self.name = "MLSecOps Guardrails"
         
-        # Sensitive patterns to redact
+        # Sensitive patterns to redact, with whether they need case-insensitive matching
         self.patterns = [
-            (r'Bearer [A-Za-z0-9\-._~+/]+=*', '[REDACTED_TOKEN]'),
-            (r'password["\s:=]+[^\s"]+', 'password=[REDACTED]'),
-            (r'(ghp|gho|gitlab)_[A-Za-z0-9]{20,}', '[REDACTED_PAT]'),
-            (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[REDACTED_EMAIL]'),
-            (r'(JWT|jwt)[-_]?[sS]ecret["\s:=]+[^\s"]+', 'jwt_secret=[REDACTED]')
+            (r'[Bb]earer [A-Za-z0-9\-._~+/]+=*', '[REDACTED_TOKEN]', False),
+            (r'password["\s:=]+[^\s"]+', 'password=[REDACTED]', True),
+            (r'(ghp|gho|gitlab)_[A-Za-z0-9]{20,}', '[REDACTED_PAT]', False),
+            (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[REDACTED_EMAIL]', True),
+            (r'(JWT|jwt)[-_]?[sS]ecret["\s:=]+[^\s"]+', 'jwt_secret=[REDACTED]', True)
         ]
+
+        # Fuse all patterns into one alternation so outlet scans content once;
+        # case folding is scoped to the patterns that need it
+        fused = "|".join(
+            f"(?P<g{i}>(?i:{pattern}))" if ignore_case else f"(?P<g{i}>{pattern})"
+            for i, (pattern, _, ignore_case) in enumerate(self.patterns)
+        )
+        self._fused = (re2 or re).compile(fused)
+        self._replacements = {f"g{i}": replacement for i, (_, replacement, _) in enumerate(self.patterns)}
+
+        # Bytes variant for ASCII-only content, which skips Unicode case folding;
+        # RE2 already matches on UTF-8 bytes internally, so it doesn't need one
+        self._fused_bytes = None if re2 else re.compile(fused.encode())
+        self._byte_replacements = {group: replacement.encode() for group, replacement in self._replacements.items()}
+
+        # Prompt injection phrases, matched case-insensitively in one scan
+        self.injection_keywords = ["ignore previous", "disregard", "system prompt"]
+        self._injection = re.compile("|".join(map(re.escape, self.injection_keywords)), re.IGNORECASE)
     
     def inlet(self, body: dict, user: Optional[dict] = None) -> dict:
         """Validate and sanitize user input"""
@@ -21,11 +45,19 @@ class Filter:
         # Check for prompt injection attempts
         for msg in messages:
             content = msg.get("content", "")
-            if any(keyword in content.lower() for keyword in ["ignore previous", "disregard", "system prompt"]):
+            if self._injection.search(content):
                 raise ValueError("Potential prompt injection detected")
         
         return body
     
+    def _redact(self, match) -> str:
+        """Return the replacement for whichever pattern matched"""
+        return self._replacements[match.lastgroup]
+    
+    def _redact_bytes(self, match) -> bytes:
+        """Return the byte replacement for whichever pattern matched"""
+        return self._byte_replacements[match.lastgroup]
+    
     def outlet(self, body: dict, user: Optional[dict] = None) -> dict:
         """Sanitize LLM output"""
         messages = body.get("messages", [])
@@ -34,9 +66,11 @@ class Filter:
             if msg.get("role") == "assistant":
                 content = msg.get("content", "")
                 
-                # Redact sensitive data
-                for pattern, replacement in self.patterns:
-                    content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
+                # Redact sensitive data in a single pass
+                if self._fused_bytes is not None and content.isascii():
+                    content = self._fused_bytes.sub(self._redact_bytes, content.encode()).decode()
+                else:
+                    content = self._fused.sub(self._redact, content)
                 
                 msg["content"] = content
         
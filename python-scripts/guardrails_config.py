@@ -1,11 +1,30 @@
+import re
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
 from guardrails import Guard
 from guardrails.validators import (
-    RegexMatch,
     DetectPII,
     RestrictToTopic,
     ToxicLanguage
 )
 
+# Every secret token format in one compiled pattern, so a response is scanned once
+SECRET_RE = re.compile(
+    r"(?:ghp|gho|gitlab)_[A-Za-z0-9]{20,}"  # GitHub / GitLab tokens
+    r"|AKIA[0-9A-Z]{16}"                    # AWS access key ids
+    r"|xox[baprs]-[A-Za-z0-9-]{10,}",       # Slack tokens
+    re.ASCII
+)
+
+def redact(text):
+    """Replace every secret token in text with a placeholder"""
+    return SECRET_RE.sub("[REDACTED]", text)
+
 # Input guardrail: Sanitize user queries
 input_guard = Guard.from_string(
     validators=[
@@ -16,28 +35,64 @@ input_guard = Guard.from_string(
     description="Validate user input before sending to LLM"
 )
 
-# Output guardrail: Prevent data leaks
+# Output guardrail: Prevent data leaks (secret tokens are redacted with SECRET_RE beforehand)
 output_guard = Guard.from_string(
     validators=[
-        DetectPII(pii_entities=["API_KEY", "PASSWORD", "SECRET"]),
-        RegexMatch(
-            regex=r"(ghp|gho|gitlab)_[A-Za-z0-9]{20,}",
-            match_type="none",
-            on_fail="fix"  # Redact tokens
-        )
+        DetectPII(pii_entities=["API_KEY", "PASSWORD", "SECRET"])
     ],
     description="Sanitize LLM output before showing to user"
 )
 
-def validate_query(user_input):
+@dataclass(frozen=True)
+class GuardResult:
+    """The parts of a ValidationOutcome callers need, small enough to cache"""
+    passed: bool
+    output: Any
+    error: Optional[str] = None
+
+def sha1_cached(maxsize):
+    """Memoize a check of one text by the text's sha1, so cache keys never hold the full text"""
+    def decorator(check):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(check)
+        def wrapper(text):
+            key = hashlib.sha1(text.encode()).hexdigest()
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+            result = check(text)
+            with lock:
+                cache[key] = result
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+        return wrapper
+    return decorator
+
+# Scheduled prompts and their answers repeat, so skip re-running the validator models on them
+@sha1_cached(maxsize=4096)
+def _check_query(user_input):
     result = input_guard.validate(user_input)
+    return GuardResult(result.validation_passed, result.validated_output, result.error)
+
+@sha1_cached(maxsize=4096)
+def _check_response(llm_output):
+    # Redact tokens
+    redacted = redact(llm_output)
+    result = output_guard.validate(redacted)
     if not result.validation_passed:
+        # Redact sensitive data
+        return GuardResult(False, result.validated_output.replace_sensitive_data("[REDACTED]"))
+    return GuardResult(True, redacted)
+
+def validate_query(user_input):
+    result = _check_query(user_input)
+    if not result.passed:
         raise ValueError(f"Input validation failed: {result.error}")
-    return result.validated_output
+    return result.output
 
 def validate_response(llm_output):
-    result = output_guard.validate(llm_output)
-    if not result.validation_passed:
-        # Redact sensitive data
-        return result.validated_output.replace_sensitive_data("[REDACTED]")
-    return llm_output
\ No newline at end of file
+    return _check_response(llm_output).output
\ No newline at end of file